@@ -1,52 +1,58 @@
-from pipeline_base import Pipeline, stage, provider
-
-
-pipeline = (
-    Pipeline()
-    .if_("debug_mode", lambda b: (
-        b.match("mode", lambda m: (
-            m.case("verbose")
-                .stage(display_debug_verbose),
-            m.case("compact")
-                .stage(display_debug_compact),
-        ))
-    ))
-    .else_(lambda b: (
-        b.stage(display_normal),
-    ))
-)
-
-=>
-
-pipeline = (
-    Pipeline()
-        .match(True, lambda b: (
-            b.case("debug_mode")
-                .match("mode", lambda m: (
-                    m.case("verbose")
-                        .stage(display_debug_verbose),
-                    m.case("compact")
-                        .stage(display_debug_compact),
-                )),
-            b.default()
-                .stage(display_debug_compact)
-        ))
-)
+"""Design notes for conditional branching.
 
+Sketches of the if_/else_ API and how it would desugar into the existing
+match-based dispatch. Not runnable code — kept as a docstring so the
+module stays importable and tooling that compiles the tree doesn't trip
+over it.
 
+    from pipeline_base import Pipeline, stage, provider
 
 
-pipeline = (
-    Pipeline()
-        .match("mode", lambda m: (
-            m.case("debug_verbose")
-                .stage(display_debug_verbose),
-            m.case("debug_compact")
-                .stage(display_debug_compact),
-            m.default()
-                .stage(display_normal)
+    pipeline = (
+        Pipeline()
+        .if_("debug_mode", lambda b: (
+            b.match("mode", lambda m: (
+                m.case("verbose")
+                    .stage(display_debug_verbose),
+                m.case("compact")
+                    .stage(display_debug_compact),
+            ))
         ))
-)
-
-
-pipeline.run_sync()
\ No newline at end of file
+        .else_(lambda b: (
+            b.stage(display_normal),
+        ))
+    )
+
+    =>
+
+    pipeline = (
+        Pipeline()
+            .match(True, lambda b: (
+                b.case("debug_mode")
+                    .match("mode", lambda m: (
+                        m.case("verbose")
+                            .stage(display_debug_verbose),
+                        m.case("compact")
+                            .stage(display_debug_compact),
+                    )),
+                b.default()
+                    .stage(display_debug_compact)
+            ))
+    )
+
+
+    pipeline = (
+        Pipeline()
+            .match("mode", lambda m: (
+                m.case("debug_verbose")
+                    .stage(display_debug_verbose),
+                m.case("debug_compact")
+                    .stage(display_debug_compact),
+                m.default()
+                    .stage(display_normal)
+            ))
+    )
+
+
+    pipeline.run_sync()
+"""
@@ -1,36 +1,152 @@
+import asyncio
 import dataclasses
+import pickle
+from collections import ChainMap, OrderedDict, namedtuple
 from functools import lru_cache, wraps
-from types import NoneType
+from operator import itemgetter
+from types import MappingProxyType, NoneType
 from typing import Annotated, Any, Dict, Generic, List, NamedTuple, Self, Tuple, Type, TypeAlias, TypeVar, Callable, Union, get_args, get_origin, get_type_hints, _GenericAlias
 from dataclasses import dataclass
 import inspect
+import sys
+import time
 
 CACHE_SIZE = None
 CACHE_DEFAULT_SIZE = 128
 THROW_ERROR_ON_MISSING_RET_ANN = False
+# Set to True (before pipelines are defined) to compile every input schema
+# to a no-op, eliding validation entirely for trusted production pipelines.
+PIPELINE_SKIP_VALIDATION = False
+
+_MISSING = object()
 
 PipelineDataType = TypeVar('PipelineDataType')
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class PipelineDataDefinition(Generic[PipelineDataType]):
     type: Type[PipelineDataType]
     name: str
 
+def _intern_keys(mapping):
+    # Interned keys make the dict lookups on the hot path short-circuit on
+    # pointer identity instead of comparing string contents.
+    return {sys.intern(k) if isinstance(k, str) else k: v for k, v in mapping.items()}
+
+def _hash_value(value):
+    try:
+        return hash(value)
+    except TypeError:
+        return hash(pickle.dumps(value, protocol=5))
+
 PipelineInputMap: TypeAlias = Dict[str, Type[Any]]
 PipelineOutputMap: TypeAlias = Dict[str, Type[Any]]
 PipelineDataMap: TypeAlias = Dict[str, Any]
 
-def cache(func=None, *, size=CACHE_DEFAULT_SIZE):
+_CacheInfo = namedtuple("_CacheInfo", ["hits", "misses", "maxsize", "currsize"])
+
+def _make_cache_key(wrapper, args, kwargs):
+    if kwargs:
+        declared = getattr(wrapper, "_pipeline_inputs", None)
+        if declared:
+            kw_key = frozenset((k, _hash_value(v)) for k, v in kwargs.items() if k in declared)
+        else:
+            kw_key = frozenset((k, _hash_value(v)) for k, v in kwargs.items())
+        if args:
+            # Mixed call: fold the positional args in rather than dropping
+            # them, or calls differing only positionally would share an entry.
+            return (tuple(_hash_value(a) for a in args), kw_key)
+        return kw_key
+    if len(args) == 1 and isinstance(args[0], dict):
+        declared = getattr(wrapper, "_pipeline_inputs", None)
+        if declared:
+            return frozenset((k, _hash_value(v)) for k, v in args[0].items() if k in declared)
+        return frozenset((k, _hash_value(v)) for k, v in args[0].items())
+    return tuple(_hash_value(a) for a in args)
+
+class _PipelineLRU:
+    """Bounded store backing @cache, with lru_cache-style accounting.
+
+    policy="lru" evicts least-recently-used. policy="wreciprocal" weighs
+    entries by size/compute-cost and evicts the one that is largest and
+    cheapest to recompute first, which suits pipelines whose intermediates
+    are big (arrays, frames) but fast to rebuild.
+    """
+
+    __slots__ = ("maxsize", "store", "hits", "misses", "policy", "weights")
+
+    _SENTINEL = object()
+
+    def __init__(self, maxsize, policy="lru"):
+        if policy not in ("lru", "wreciprocal"):
+            raise ValueError(f"unknown cache policy: {policy!r}")
+        self.maxsize = maxsize
+        self.store: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.policy = policy
+        # key -> size/cost score, kept only for weighted eviction.
+        self.weights: Dict[Any, float] = {}
+
+    def get(self, key):
+        value = self.store.get(key, self._SENTINEL)
+        if value is self._SENTINEL:
+            self.misses += 1
+            return self._SENTINEL
+        self.hits += 1
+        self.store.move_to_end(key)
+        return value
+
+    def set(self, key, value, cost=0.0):
+        self.store[key] = value
+        if self.policy == "wreciprocal":
+            # Guard against zero cost on timer-resolution-fast calls.
+            self.weights[key] = sys.getsizeof(value) / (cost if cost > 1e-9 else 1e-9)
+        if self.maxsize is not None and len(self.store) > self.maxsize:
+            if self.policy == "wreciprocal":
+                victim = max(self.weights, key=self.weights.__getitem__)
+                del self.store[victim]
+                del self.weights[victim]
+            else:
+                self.store.popitem(last=False)
+
+    def clear(self):
+        self.store.clear()
+        self.weights.clear()
+        self.hits = self.misses = 0
+
+    def info(self):
+        return _CacheInfo(self.hits, self.misses, self.maxsize, len(self.store))
+
+def cache(func=None, *, size=CACHE_DEFAULT_SIZE, policy="lru"):
+    def decorator(f):
+        lru = _PipelineLRU(size, policy)
+        miss = _PipelineLRU._SENTINEL
+        timed = policy == "wreciprocal"
+
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            key = _make_cache_key(wrapper, args, kwargs)
+            result = lru.get(key)
+            if result is miss:
+                if timed:
+                    started = time.perf_counter()
+                    result = f(*args, **kwargs)
+                    lru.set(key, result, time.perf_counter() - started)
+                else:
+                    result = f(*args, **kwargs)
+                    lru.set(key, result)
+            return result
+
+        wrapper.cache_clear = lru.clear
+        wrapper.cache_info = lru.info
+        wrapper._pipeline_cache = True
+        return wrapper
+
     if func is None:
         # Decorator called with parentheses and optional size, e.g. @cache(size=5)
-        def wrapper(f):
-            f._pipeline_cache = True
-            return lru_cache(maxsize=size)(f)
-        return wrapper
-    else:
-        func._pipeline_cache = True
-        # Decorator called without parentheses, e.g. @cache
-        return lru_cache(maxsize=size)(func)
+        return decorator
+    # Decorator called without parentheses, e.g. @cache
+    return decorator(func)
 
 
 def normalize_io(io):
@@ -39,13 +155,59 @@ def normalize_io(io):
     if isinstance(io, dict):
         return io
     if isinstance(io, list):
-        return {k: Any for k in io}
+        # C-level fill; skips the per-key Any global lookup a comprehension
+        # would do.
+        return dict.fromkeys(io, Any)
     if isinstance(io, str):
         return {io: Any}
     raise TypeError("inputs/outputs must be dict, list, or str")
 
+def _is_checkable_type(expected_type):
+    # Only concrete classes can be isinstance-checked. Any is a class on
+    # 3.11+ but still rejects isinstance, and object would let the _MISSING
+    # sentinel through, so both take the membership-only path.
+    return (isinstance(expected_type, type)
+            and expected_type is not object
+            and expected_type is not Any)
+
+def _compile_validator(inputs):
+    # An empty schema compiles to None so callers can skip the call outright.
+    # Non-empty schemas are specialized into straight-line generated source
+    # with the expected types bound in the generated function's globals. Keys
+    # with a concrete expected type use a single data.get() against _MISSING:
+    # the sentinel fails the isinstance check, so the happy path costs one
+    # lookup and one C call per key, and the error branch sorts out whether
+    # the key was absent or merely the wrong type. Keys typed Any (or object,
+    # which _MISSING would wrongly satisfy) only get a membership test.
+    if PIPELINE_SKIP_VALIDATION or not inputs:
+        return None
+    namespace = {"_MISSING": _MISSING}
+    lines = ["def validate(data):", "    get = data.get"]
+    for index, (key, expected_type) in enumerate(inputs.items()):
+        namespace[f"key_{index}"] = key
+        if _is_checkable_type(expected_type):
+            namespace[f"type_{index}"] = expected_type
+            lines.append(f"    value_{index} = get({key!r}, _MISSING)")
+            lines.append(f"    if not isinstance(value_{index}, type_{index}):")
+            lines.append(f"        if value_{index} is _MISSING:")
+            lines.append(f"            raise KeyError('Missing required input: ' + key_{index})")
+            lines.append(f"        raise TypeError('Expected type {{}} for {{}}, got {{}}'.format(type_{index}, key_{index}, type(value_{index})))")
+        else:
+            lines.append(f"    if {key!r} not in data:")
+            lines.append(f"        raise KeyError('Missing required input: ' + key_{index})")
+    exec(compile("\n".join(lines), "<validator>", "exec"), namespace)
+    return namespace["validate"]
+
+# Both introspection entry points are famously slow (get_type_hints walks
+# the MRO and evaluates forward refs; signature builds Parameter objects).
+# Decoration is usually one-shot, but stages generated in loops or test
+# reloads hit the same function objects repeatedly, so cache unbounded --
+# entries are bounded by the number of distinct decorated functions.
+_cached_type_hints = lru_cache(maxsize=None)(get_type_hints)
+_cached_signature = lru_cache(maxsize=None)(inspect.signature)
+
 def infer_input_types(func):
-    sig = inspect.signature(func)
+    sig = _cached_signature(func)
     inputs = {}
     for name, param in sig.parameters.items():
         if name == 'self':  # ignore methods self param
@@ -62,28 +224,53 @@ def is_namedtuple_instance(x):
         hasattr(x, "_fields")
     )
 
+# Result-shape handlers memoized by (type, output arity): the first call of
+# a given shape walks the isinstance cascade below, every later one is a
+# single dict hit. Keyed on arity too because the same type normalizes
+# differently for one output versus several.
+_normalize_dispatch: Dict[Tuple[type, int], Callable] = {}
+
+def _normalize_sequence(result, output_names, stage_name):
+    if len(result) != len(output_names):
+        raise ValueError(
+            f"{stage_name} returned {len(result)} values, "
+            f"but expected {len(output_names)}: {output_names}"
+        )
+    return dict(zip(output_names, result))
+
 def normalize_result(result, output_names, stage_name):
+    handler = _normalize_dispatch.get((type(result), len(output_names)))
+    if handler is not None:
+        return handler(result, output_names, stage_name)
+
+    key = (type(result), len(output_names))
     if isinstance(result, dict):
+        _normalize_dispatch[key] = lambda r, n, s: r
         return result
 
     if isinstance(result, (tuple, list)):
-        if len(result) != len(output_names):
-            raise ValueError(
-                f"{stage_name} returned {len(result)} values, "
-                f"but expected {len(output_names)}: {output_names}"
-            )
-        return dict(zip(output_names, result))
+        _normalize_dispatch[key] = _normalize_sequence
+        return _normalize_sequence(result, output_names, stage_name)
 
     if is_namedtuple_instance(result):
+        _normalize_dispatch[key] = lambda r, n, s: r._asdict()
         return result._asdict()
 
     if dataclasses.is_dataclass(result):
-        return dataclasses.asdict(result)
+        # Shallow field mapping, not dataclasses.asdict: stages want the
+        # top-level fields as records, and asdict deep-copies any nested
+        # dataclasses/lists/dicts on every invocation.
+        def _normalize_dataclass(r, n, s):
+            return {name: getattr(r, name) for name in type(r).__dataclass_fields__}
+        _normalize_dispatch[key] = _normalize_dataclass
+        return _normalize_dataclass(result, output_names, stage_name)
 
     if len(output_names) == 1:
+        _normalize_dispatch[key] = lambda r, n, s: {n[0]: r}
         return {output_names[0]: result}
-    
+
     if len(output_names) == 0:
+        _normalize_dispatch[key] = lambda r, n, s: {}
         return {}
 
     raise TypeError(
@@ -91,7 +278,7 @@ def normalize_result(result, output_names, stage_name):
     )
 
 def infer_output_types(func, name: Union[str, None] = None, names: Union[List[str], None] = None) -> Dict[str, type]:
-    hints = get_type_hints(func)
+    hints = _cached_type_hints(func)
     ret_ann = hints.get('return', None)
     if ret_ann is None:
         if THROW_ERROR_ON_MISSING_RET_ANN:
@@ -130,17 +317,47 @@ def infer_output_types(func, name: Union[str, None] = None, names: Union[List[st
 
     return {}
 
-class PipelineTransformer:
-    
-    def __init__(self, func):
-        super().__init__()
-        if not getattr(func, "_pipeline_transformer", False):
-            raise ValueError("function is not a transformer must use the @transformer or @provider decorators")
+class _FuncWrapper:
+    # Shared machinery for the two wrapper types around a plain decorated
+    # function (FunctionStage and PipelineTransformer). Method-only mixin:
+    # __slots__ stays empty so each subclass keeps its own slot layout, and
+    # a single code object per method means both wrapper types warm the
+    # same adaptive-interpreter caches instead of specializing twice.
+
+    __slots__ = ()
+
+    def _bind_func(self, func):
         self._func: Callable = func
         self._inputs: PipelineInputMap = getattr(func, "_pipeline_inputs", {})
         self._outputs: PipelineOutputMap = getattr(func, "_pipeline_outputs", {})
         self._unwrap_inputs: bool = getattr(func, "_pipeline_unwrap_inputs", False)
         self._cached: bool = getattr(func, "_pipeline_cache", False)
+        self._validate = _compile_validator(self._inputs)
+        self._inputs_items = tuple(self._inputs.items())
+        self._outputs_keys = frozenset(self._outputs)
+        self._output_names = tuple(self._outputs)
+        self._single_output_key = self._output_names[0] if len(self._output_names) == 1 else None
+        self._param_order = getattr(func, "_pipeline_param_order", None)
+
+    def _call_func(self, inputs):
+        if self._unwrap_inputs:
+            order = self._param_order
+            if order is not None:
+                # Positional call: skips the ** dict rebuild and keyword match.
+                return self._func(*[inputs[p] for p in order])
+            return self._func(**inputs)
+        return self._func(inputs)
+
+    def _invoke(self, inputs):
+        result = self._call_func(inputs)
+        # Wrap the output if it's not a dict. Single plain values -- the
+        # overwhelmingly common shape -- skip the normalize cascade.
+        single = self._single_output_key
+        if (single is not None
+                and not isinstance(result, (dict, tuple, list))
+                and not dataclasses.is_dataclass(result)):
+            return {single: result}
+        return normalize_result(result, self._output_names, self._get_name())
 
     def has_cache(self):
         return self._cached
@@ -160,44 +377,90 @@ class PipelineTransformer:
                 pass
         return None
 
+    def _get_name(self):
+        return getattr(self._func, '__name__', 'anonymous')
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__} func={self._get_name()} inputs={list(self._inputs.keys())} outputs={list(self._outputs.keys())}>"
+
+
+class PipelineTransformer(_FuncWrapper):
+
+    __slots__ = ("_func", "_inputs", "_outputs", "_unwrap_inputs", "_cached", "_validate", "_inputs_items", "_outputs_keys", "_output_names", "_single_output_key", "_param_order", "_memo")
+
+    def __init__(self, func):
+        if not getattr(func, "_pipeline_transformer", False):
+            raise ValueError("function is not a transformer must use the @transformer or @provider decorators")
+        self._bind_func(func)
+        self._memo: OrderedDict = OrderedDict()
+
+    def clear_cache(self):
+        self._memo.clear()
+        _FuncWrapper.clear_cache(self)
+
     def get_inputs(self):
         return self._inputs
-    
+
+    def get_inputs_items(self):
+        return self._inputs_items
+
     def get_outputs(self):
         return self._outputs
-    
+
+    def get_output_keys(self):
+        return self._outputs_keys
+
     def _validate_inputs(self, inputs: PipelineDataMap):
-        for key, expected_type in self._inputs.items():
-            if key not in inputs:
-                raise KeyError(f"Missing required input: {key}")
-            if not isinstance(inputs[key], expected_type):
-                raise TypeError(f"Expected type {expected_type} for {key}, got {type(inputs[key])}")
-        
+        if self._validate is not None:
+            self._validate(inputs)
+
     def transform(self, inputs: PipelineDataMap) -> PipelineDataMap:
-        self._validate_inputs(inputs)
-        if self._unwrap_inputs:
-            result = self._func(**inputs)
-        else:
-            result = self._func(inputs)
-        # Wrap the output if it's not a dict
-        output_names = list(self._outputs)
-        result = normalize_result(result, output_names, self._get_name())
+        if self._validate is not None:
+            self._validate(inputs)
+        if self._cached:
+            # Identity-keyed LRU at the transform boundary: upstream
+            # producers reuse record objects, so matching ids mean the
+            # transformer would recompute the exact same result. Each entry
+            # pins the input objects alive so a freed object's address can't
+            # be recycled into a false hit.
+            memo_key = tuple((key, id(inputs[key])) for key, _ in self._inputs_items)
+            memo = self._memo
+            entry = memo.get(memo_key)
+            if entry is not None:
+                memo.move_to_end(memo_key)
+                return entry[1]
+        result = self._invoke(inputs)
+        if self._cached:
+            pins = tuple(inputs[key] for key, _ in self._inputs_items)
+            memo[memo_key] = (pins, result)
+            if len(memo) > CACHE_DEFAULT_SIZE:
+                memo.popitem(last=False)
         return result
-    
-    def _get_name(self):
-        return getattr(self._func, '__name__', 'anonymous')
-    
-    def __repr__(self):
-        return f"<{self.__class__.__name__} func={self._get_name()} inputs={list(self._inputs.keys())} outputs={list(self._outputs.keys())}>"
 
 
-def transformer(func=None, *, inputs=None, outputs=None, output_name=None, output_names=None):
+def _param_call_order(f):
+    # Parameter names in declaration order, recorded so wrappers can call
+    # positionally instead of through ** unpacking. Only plain
+    # positional-or-keyword signatures qualify; *args/**kwargs, keyword-only
+    # parameters and methods fall back to the keyword call.
+    params = _cached_signature(f).parameters
+    if any(param.kind is not inspect.Parameter.POSITIONAL_OR_KEYWORD
+           for param in params.values()) or "self" in params:
+        return None
+    return tuple(params)
+
+def transformer(func=None, *, inputs=None, outputs=None, output_name=None, output_names=None, jit=None):
     def decorator(f):
-        f._pipeline_transformer = True
-        f._pipeline_inputs = normalize_io(inputs) if inputs is not None else infer_input_types(f)
-        f._pipeline_outputs = normalize_io(outputs) if outputs is not None else infer_output_types(f, name=output_name, names=output_names)
-        f._pipeline_unwrap_inputs = inputs is None
-        return f
+        input_map = MappingProxyType(_intern_keys(normalize_io(inputs) if inputs is not None else infer_input_types(f)))
+        output_map = MappingProxyType(_intern_keys(normalize_io(outputs) if outputs is not None else infer_output_types(f, name=output_name, names=output_names)))
+        use_jit = _should_auto_jit(input_map, output_map) if jit is None else jit
+        target = _jit_wrap(f, use_jit) if use_jit else f
+        target._pipeline_transformer = True
+        target._pipeline_inputs = input_map
+        target._pipeline_outputs = output_map
+        target._pipeline_unwrap_inputs = inputs is None
+        target._pipeline_param_order = _param_call_order(f)
+        return target
     
     if func is None:
         return decorator
@@ -207,26 +470,42 @@ def transformer(func=None, *, inputs=None, outputs=None, output_name=None, outpu
 
 class PipelineStage:
 
+    __slots__ = ("_inputs", "_outputs", "_validate", "_inputs_items", "_outputs_keys")
+
     def __init__(self):
-        super().__init__()
         self._inputs: PipelineInputMap = {}
         self._outputs: PipelineOutputMap = {}
+        self._validate = _compile_validator(self._inputs)
+        self._inputs_items = tuple(self._inputs.items())
+        self._outputs_keys = frozenset(self._outputs)
 
     def get_inputs(self):
         return self._inputs
-    
+
+    def get_inputs_items(self):
+        # Pre-materialized (key, type) pairs so hot paths iterate a tuple
+        # instead of building a dict_items view per call.
+        return self._inputs_items
+
     def get_outputs(self):
         return self._outputs
 
+    def get_output_keys(self):
+        return self._outputs_keys
+
     def _validate_inputs(self, inputs: PipelineDataMap):
-        for key, expected_type in self._inputs.items():
-            if key not in inputs:
-                raise KeyError(f"Missing required input: {key}")
-            if not isinstance(inputs[key], expected_type):
-                raise TypeError(f"Expected type {expected_type} for {key}, got {type(inputs[key])}")
+        if self._validate is not None:
+            self._validate(inputs)
 
-    def run(self, inputs: PipelineDataMap, pipeline=None) -> PipelineDataMap:
-        self._validate_inputs(inputs)
+    def run(self, inputs: PipelineDataMap, pipeline=None, _validated=False) -> PipelineDataMap:
+        if not _validated and self._validate is not None:
+            self._validate(inputs)
+
+    def run_into(self, inputs: PipelineDataMap, out: PipelineDataMap, pipeline=None, _validated=False):
+        result = self.run(inputs, pipeline, _validated)
+        if result:
+            out.update(result)
+        return result
 
     def has_cache(self):
         return False
@@ -244,58 +523,119 @@ class PipelineStage:
 
         
 
-class FunctionStage(PipelineStage):
+class FunctionStage(_FuncWrapper, PipelineStage):
+    # _FuncWrapper comes first so its has_cache/clear_cache/_get_name win
+    # over the PipelineStage defaults.
+
+    __slots__ = ("_func", "_unwrap_inputs", "_cached", "_is_async", "_output_names", "_single_output_key", "_param_order")
 
     def __init__(self, func):
-        super().__init__()
         if not getattr(func, "_pipeline_stage", False):
             raise ValueError("function is not a stage must use the @stage decorator")
-        self._func: Callable = func
-        self._inputs: PipelineInputMap = getattr(func, "_pipeline_inputs", {})
-        self._outputs: PipelineOutputMap = getattr(func, "_pipeline_outputs", {})
-        self._unwrap_inputs: bool = getattr(func, "_pipeline_unwrap_inputs", False)
-        self._cached: bool = getattr(func, "_pipeline_cache", False)
+        self._is_async: bool = inspect.iscoroutinefunction(func)
+        self._bind_func(func)
 
-    def has_cache(self):
-        return self._cached
+    def run(self, inputs: PipelineDataMap, pipeline=None, _validated=False) -> PipelineDataMap:
+        if not _validated and self._validate is not None:
+            self._validate(inputs)
+        return self._invoke(inputs)
 
-    def clear_cache(self):
-        if self._cached:
-            try:
-                self._func.cache_clear()
-            except AttributeError:
-                pass
-
-    def cache_info(self):
-        if self._cached:
-            try:
-                return self._func.cache_info()
-            except AttributeError:
-                pass
-        return None
-    
-    def _get_name(self):
-        return getattr(self._func, '__name__', 'anonymous')
-
-    def run(self, inputs: PipelineDataMap, pipeline=None) -> PipelineDataMap:
-        self._validate_inputs(inputs)
+    async def run_async(self, inputs: PipelineDataMap, pipeline=None, _validated=False) -> PipelineDataMap:
+        if not _validated and self._validate is not None:
+            self._validate(inputs)
         if self._unwrap_inputs:
-            result = self._func(**inputs)
+            order = self._param_order
+            if order is not None:
+                result = await self._func(*[inputs[p] for p in order])
+            else:
+                result = await self._func(**inputs)
         else:
-            result = self._func(inputs)
-        # Wrap the output if it's not a dict
-        output_names = list(self._outputs)
+            result = await self._func(inputs)
+        single = self._single_output_key
+        if (single is not None
+                and not isinstance(result, (dict, tuple, list))
+                and not dataclasses.is_dataclass(result)):
+            return {single: result}
+        return normalize_result(result, self._output_names, self._get_name())
+
+    def run_into(self, inputs: PipelineDataMap, out: PipelineDataMap, pipeline=None, _validated=False):
+        if not _validated and self._validate is not None:
+            self._validate(inputs)
+        result = self._call_func(inputs)
+        output_names = self._output_names
+        if (len(output_names) == 1
+                and not isinstance(result, (dict, tuple, list))
+                and not dataclasses.is_dataclass(result)):
+            # Single plain value: write it straight into the shared record
+            # dict without allocating an intermediate result dict.
+            out[output_names[0]] = result
+            return None
         result = normalize_result(result, output_names, self._get_name())
+        out.update(result)
         return result
-    
 
-def stage(func=None, *, inputs=None, outputs=None, output_name=None, output_names=None):
-    def decorator(f):
-        f._pipeline_stage = True
-        f._pipeline_inputs = normalize_io(inputs) if inputs is not None else infer_input_types(f)
-        f._pipeline_outputs = normalize_io(outputs) if outputs is not None else infer_output_types(f, name=output_name, names=output_names)
-        f._pipeline_unwrap_inputs = inputs is None
+
+_JIT_NUMERIC_TYPES = (int, float, complex, bool)
+
+def _is_jit_numeric(expected_type):
+    if expected_type in _JIT_NUMERIC_TYPES:
+        return True
+    # numpy types (ndarray, float64, ...) without importing numpy here.
+    return getattr(expected_type, "__module__", "").startswith("numpy")
+
+def _should_auto_jit(input_map, output_map):
+    # JIT is only worth attempting when every declared input and output is
+    # a numeric scalar or numpy type; anything else stays on the CPython
+    # path where dispatch overhead is dwarfed by the body anyway.
+    if not input_map or not output_map:
+        return False
+    declared = list(input_map.values()) + list(output_map.values())
+    return all(_is_jit_numeric(t) for t in declared)
+
+def _jit_wrap(f, jit):
+    # Best-effort numba compilation for numerically hot stage bodies. When
+    # numba is unavailable (or compilation fails) the plain function is used.
+    try:
+        import numba
+        from numba.core.errors import NumbaError
+    except ImportError:
+        return f
+    options = jit if isinstance(jit, dict) else {"cache": True}
+    try:
+        compiled = numba.njit(**options)(f)
+    except Exception:
         return f
+    params = tuple(_cached_signature(f).parameters)
+    target = compiled
+
+    @wraps(f)
+    def jit_caller(*args, **kwargs):
+        nonlocal target
+        if kwargs:
+            args = args + tuple(kwargs[p] for p in params[len(args):] if p in kwargs)
+        try:
+            return target(*args)
+        except NumbaError:
+            # njit compiles lazily, so typing failures only surface at the
+            # first real call. Fall back to the plain function permanently
+            # rather than crashing a stage that ran fine un-jitted.
+            target = f
+            return f(*args)
+
+    return jit_caller
+
+def stage(func=None, *, inputs=None, outputs=None, output_name=None, output_names=None, jit=None):
+    def decorator(f):
+        input_map = MappingProxyType(_intern_keys(normalize_io(inputs) if inputs is not None else infer_input_types(f)))
+        output_map = MappingProxyType(_intern_keys(normalize_io(outputs) if outputs is not None else infer_output_types(f, name=output_name, names=output_names)))
+        use_jit = _should_auto_jit(input_map, output_map) if jit is None else jit
+        target = _jit_wrap(f, use_jit) if use_jit else f
+        target._pipeline_stage = True
+        target._pipeline_inputs = input_map
+        target._pipeline_outputs = output_map
+        target._pipeline_unwrap_inputs = inputs is None
+        target._pipeline_param_order = _param_call_order(f)
+        return target
 
     if func is None:
         return decorator
@@ -306,11 +646,11 @@ PipelineStages: TypeAlias = List[PipelineStage]
 
 class Pipeline:
 
-    def __init__(self, dependencies: PipelineInputMap =None, outputs: PipelineInputMap=None):
-        super().__init__()
+    def __init__(self, dependencies: PipelineInputMap =None, outputs: PipelineInputMap=None, retain=None, profile_reorder=False, memoize=False):
         self.transforms: PipelineTransformers = []
         self.stages: PipelineStages = []
         self.data_records: PipelineDataMap = {}
+        self._scope: ChainMap = ChainMap(self.data_records)
         self._deps_set = True
         if dependencies is None:
             dependencies = {}
@@ -320,7 +660,36 @@ class Pipeline:
         if outputs is None:
             outputs = {}
             self._out_set = False
-        self.outputs: PipelineOutputMap = outputs
+        self.outputs = outputs
+        self._stage_cache: OrderedDict[tuple, dict] = OrderedDict()
+        self._stage_cache_max = CACHE_DEFAULT_SIZE
+        self._compiled: Union[List[Tuple[PipelineStage, Callable]], None] = None
+        self._disjoint_outputs = False
+        self._dag_levels: Union[List[List[int]], None] = None
+        # retain=None keeps every record for the life of the run (default).
+        # Passing a collection of key names enables streaming mode: records
+        # are dropped once their last consuming stage has run, except pipeline
+        # outputs and the listed keys.
+        self._retain: Union[frozenset, None] = None if retain is None else frozenset(retain)
+        self._free_after: Union[List[List[str]], None] = None
+        self._specialized: Union[Callable, bool, None] = None
+        self._profile_reorder = profile_reorder
+        self._cached_stages: PipelineStages = []
+        self._cached_transformers: PipelineTransformers = []
+        self._plan: Union[Dict[str, Tuple[PipelineTransformer, ...]], None] = None
+        self._producer_index: Dict[str, PipelineTransformer] = {}
+        self._dep_validate: Union[Callable, None] = None
+        self._dep_schema: Union[PipelineInputMap, None] = None
+        # Names resolved out of parent scopes (or ambiguous producers) during
+        # the current run; kept across stages so overlapping requests from
+        # later stages are a single dict hit. Reset at the top of each run.
+        self._resolution_cache: Dict[str, Any] = {}
+        # memoize=True short-circuits back-to-back runs with identical
+        # immutable inputs. Opt-in because stages with side effects (logging,
+        # IO) would silently be skipped on the repeat run.
+        self._memoize = memoize
+        self._last_input_sig: Union[tuple, None] = None
+        self._last_output: Union[PipelineDataMap, None] = None
 
 
     def get_dependencies(self) -> PipelineInputMap:
@@ -329,91 +698,489 @@ class Pipeline:
     def get_outputs(self) -> PipelineOutputMap:
         return self.outputs
 
+    @property
+    def outputs(self) -> PipelineOutputMap:
+        return self._outputs_map
+
+    @outputs.setter
+    def outputs(self, outputs: PipelineOutputMap):
+        # outputs is public and rebinding it must stay live: rebuild the
+        # keyset run() filters by and drop any plan built on the old schema.
+        self._outputs_map = outputs
+        self._outputs_keyset = frozenset(outputs)
+        self._invalidate_plan()
+
     def _has_input(self, parents,  input: PipelineDataDefinition[PipelineDataType]) -> bool:
-        if input.name in self.data_records:
-            return True
-        return any(input.name in t.get_outputs().keys() for t in self.transforms)
+        return self._has_name(input.name)
+
+    def _build_plan(self):
+        # Static producer plan: an ordered candidate list per output name.
+        # Candidates keep registration order because resolution is lazy and
+        # tolerant — a transformer whose own inputs cannot be satisfied is
+        # skipped in favor of the next producer of the same name, so a strict
+        # eager topological ordering cannot be materialized up front.
+        candidates: Dict[str, List[PipelineTransformer]] = {}
+        for transformer in self.transforms:
+            for name in transformer.get_outputs():
+                candidates.setdefault(name, []).append(transformer)
+        self._plan = {name: tuple(entries) for name, entries in candidates.items()}
 
+    def _candidates_for(self, name: str) -> Tuple[PipelineTransformer, ...]:
+        if self._plan is None:
+            self._build_plan()
+        return self._plan.get(name, ())
 
-    def _get_input(self, parents,  input: PipelineDataDefinition[PipelineDataType]) -> PipelineDataType:
-        # First, try direct data lookup
-        if input.name in self.data_records:
-            return self.data_records[input.name]
+    def _has_name(self, name: str) -> bool:
+        # The producer index is maintained incrementally, so membership is a
+        # hash lookup with no lazy plan rebuild.
+        return name in self.data_records or name in self._producer_index
 
-        # Otherwise, search for a transformer that can produce it
-        for transformer in self.transforms:
-            if input.name in transformer.get_outputs().keys():
-                # Build input map for transformer
-                required_inputs = {}
-                for key, expected_type in transformer.get_inputs().items():
-                    input_def = PipelineDataDefinition(type=expected_type, name=key)
-                    try:
-                        required_inputs[key] = self.resolve_input(parents.copy(), input_def)  # Recurse if needed
-                    except LookupError as e:
-                        break;
-                
+    def _get_input(self, parents,  input: PipelineDataDefinition[PipelineDataType]) -> PipelineDataType:
+        return self._get_by_name(parents, input.name)
+
+    def _get_by_name(self, parents, name: str):
+        # First, try direct data lookup: one probe via the sentinel instead
+        # of a membership test followed by a second lookup.
+        value = self.data_records.get(name, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        # Otherwise, try the planned producers for this name in order
+        for transformer in self._candidates_for(name):
+            # Build input map for transformer
+            required_inputs = {}
+            for key in transformer.get_inputs():
                 try:
-                    result = transformer.transform(required_inputs)
-                except KeyError as e:
-                    continue;
-                self.data_records.update(result)
-                return result[input.name]  # After transform, input should be available
-            
-        raise KeyError(f"No data or transformer found for input: {input.name}")
+                    required_inputs[key] = self._resolve_by_name(parents.copy(), key)  # Recurse if needed
+                except LookupError as e:
+                    break;
+
+            try:
+                result = transformer.transform(required_inputs)
+            except KeyError as e:
+                continue;
+            self.data_records.update(result)
+            return result[name]  # After transform, input should be available
+
+        raise KeyError(f"No data or transformer found for input: {name}")
 
     def resolve_input(self, parents: Self, input: PipelineDataDefinition[PipelineDataType]) -> PipelineDataType:
-        if self._has_input(parents, input):
-            return self._get_input(parents, input)
+        return self._resolve_by_name(parents, input.name)
+
+    def _resolve_stack(self, parents, name: str):
+        return self._resolve_batch(parents, (name,))[name]
+
+    def _resolve_batch(self, parents, names) -> PipelineDataMap:
+        # Iterative DFS over single-producer transformer chains: fires ready
+        # transformers off an explicit stack so deep chains cost no Python
+        # call frames. Names with zero or several candidate producers (or
+        # inputs owned by parent scopes) drop to the tolerant recursive path.
+        # Seeding the stack with a whole batch of names lets shared producers
+        # (including multi-output transformers) fire exactly once per sweep.
+        records = self.data_records
+        extras = self._resolution_cache
+        stack = list(names)
+        while stack:
+            top = stack[-1]
+            if top in records or top in extras:
+                stack.pop()
+                continue
+            candidates = self._candidates_for(top)
+            if len(candidates) == 1:
+                transformer = candidates[0]
+                missing = [key for key in transformer.get_inputs()
+                           if key not in records and key not in extras]
+                if not missing:
+                    required = {}
+                    for key in transformer.get_inputs():
+                        value = records.get(key, _MISSING)
+                        required[key] = value if value is not _MISSING else extras[key]
+                    try:
+                        result = transformer.transform(required)
+                    except KeyError:
+                        raise KeyError(f"No data or transformer found for input: {top}")
+                    records.update(result)
+                    if top not in records:
+                        raise KeyError(f"No data or transformer found for input: {top}")
+                    stack.pop()
+                    continue
+                chainable = [key for key in missing
+                             if len(self._candidates_for(key)) == 1 and key not in stack]
+                if len(chainable) == len(missing):
+                    stack.extend(chainable)
+                    continue
+            extras[top] = self._resolve_by_name(parents.copy(), top)
+            stack.pop()
+        resolved = {}
+        for name in names:
+            value = records.get(name, _MISSING)
+            resolved[name] = value if value is not _MISSING else extras[name]
+        return resolved
+
+    def _resolve_by_name(self, parents, name: str):
+        if self._has_name(name):
+            return self._get_by_name(parents, name)
+        # Fast path: an ancestor scope already materialized this name, so a
+        # single C-level ChainMap lookup beats walking the parent chain.
+        try:
+            return self._scope[name]
+        except KeyError:
+            pass
         if parents is not None and len(parents) > 0:
             parent = parents[-1]
             parents.pop()
-            return parent.resolve_input(parents.copy(), input)
+            return parent._resolve_by_name(parents.copy(), name)
         raise LookupError("Could not find way to get input")
 
     def _clear_data(self):
         self.data_records.clear()
 
     def _clear_cache(self):
-        for stage in self.stages:
+        self._stage_cache.clear()
+        for stage in self._cached_stages:
             stage.clear_cache()
 
-        for transformer in self.transforms:
+        for transformer in self._cached_transformers:
             transformer.clear_cache()
 
     def _validate_inputs(self, inputs: PipelineDataMap):
-        for key, expected_type in self.dependencies.items():
-            if key not in inputs:
-                raise KeyError(f"Missing required input: {key}")
-            if not isinstance(inputs[key], expected_type):
-                raise TypeError(f"Expected type {expected_type} for {key}, got {type(inputs[key])}")
-
-    def _run(self, inputs: PipelineDataMap, parents=None) -> PipelineDataMap:
+        # The dependency schema can be rebound after construction (via
+        # dependency() or inference from the first stage), so recompile the
+        # validator whenever the mapping object changes.
+        if self._dep_schema is not self.dependencies:
+            self._dep_validate = _compile_validator(self.dependencies)
+            self._dep_schema = self.dependencies
+        if self._dep_validate is not None:
+            self._dep_validate(inputs)
+
+    def _compile_stages(self):
+        # Capture each stage's input schema once so the hot loop only has to
+        # call a closure instead of rebuilding definitions per invocation.
+        compiled = []
+        # Keys guaranteed to be in data_records by the time a stage runs:
+        # the validated dependencies plus outputs of earlier non-branch
+        # stages. Branch outputs are a union over their cases, so only the
+        # taken case's keys actually appear; they don't count as guaranteed.
+        available = set(self.dependencies)
+        for stage in self.stages:
+            # Only concrete classes are checkable; Any and generic aliases
+            # cannot be used with isinstance. A match stage's merged schema
+            # keeps one winner per duplicate key, so checking against it
+            # would enforce an arbitrary branch's type before dispatch even
+            # picks one — conflicted keys are left to the taken branch's
+            # own validator.
+            check_types = not PIPELINE_SKIP_VALIDATION
+            conflicted = stage.conflicted_inputs() if isinstance(stage, MatchCaseBranch) else ()
+            items = tuple((key, expected_type,
+                           check_types and key not in conflicted and _is_checkable_type(expected_type))
+                          for key, expected_type in stage.get_inputs_items())
+            # Each resolver owns a pre-sized buffer reused across runs: the
+            # full key set is rewritten every call, so no clearing is needed.
+            # Stages receive the buffer directly and must not retain it past
+            # their own run (the function-calling stages unpack or copy it
+            # anyway).
+            buffer = dict.fromkeys((key for key, _, _ in items), None)
+            def resolve(parents, _items=items, _buffer=buffer, _stage=stage, _self=self):
+                required_inputs = _buffer
+                records = _self.data_records
+                missing = [key for key, _, _ in _items if key not in records]
+                if missing:
+                    try:
+                        batch = _self._resolve_batch(parents, missing)
+                    except LookupError:
+                        # Redo key-by-key so the error names the culprit.
+                        batch = {}
+                        for key in missing:
+                            try:
+                                batch[key] = _self._resolve_stack(parents, key)
+                            except LookupError:
+                                raise KeyError(f"Missing required input '{key}' for stage {_stage}")
+                else:
+                    batch = None
+                for key, expected_type, check in _items:
+                    value = records.get(key, _MISSING)
+                    if value is _MISSING:
+                        value = batch[key]
+                    # Type-check here so the stage can skip re-validating.
+                    if check and not isinstance(value, expected_type):
+                        raise TypeError(f"Expected type {expected_type} for {key}, got {type(value)}")
+                    required_inputs[key] = value
+                return required_inputs
+            if items and all(key in available for key, _, _ in items):
+                # Every input is known-present: gather with one C-level dict
+                # slice and only fall back to the general resolver if a key
+                # was dropped out from under us.
+                keys = tuple(key for key, _, _ in items)
+                # itemgetter does the multi-key lookup in C and update(zip)
+                # stores the batch in C; only single-key gathers stay as a
+                # plain subscript (itemgetter would return a bare value).
+                getter = itemgetter(*keys) if len(keys) > 1 else None
+                def resolve_present(parents, _keys=keys, _items=items, _buffer=buffer, _getter=getter, _self=self, _fallback=resolve):
+                    records = _self.data_records
+                    required_inputs = _buffer
+                    try:
+                        if _getter is not None:
+                            required_inputs.update(zip(_keys, _getter(records)))
+                        else:
+                            required_inputs[_keys[0]] = records[_keys[0]]
+                    except KeyError:
+                        return _fallback(parents)
+                    for key, expected_type, check in _items:
+                        if check and not isinstance(required_inputs[key], expected_type):
+                            raise TypeError(f"Expected type {expected_type} for {key}, got {type(required_inputs[key])}")
+                    return required_inputs
+                if not any(check for _, _, check in items):
+                    # No type checks left either: the specialized run can
+                    # inline the gather as a literal dict display.
+                    resolve_present._inline_keys = keys
+                compiled.append((stage, resolve_present))
+            else:
+                compiled.append((stage, resolve))
+            if not isinstance(stage, PipelineBranch):
+                available.update(stage.get_outputs())
+        self._compiled = compiled
+        seen = set()
+        disjoint = True
+        for stage in self.stages:
+            for key in stage.get_outputs():
+                if key in seen:
+                    disjoint = False
+                    break
+                seen.add(key)
+        self._disjoint_outputs = disjoint
+
+    def _specialize(self):
+        # Generate a straight-line function over the compiled stage list so
+        # repeated runs skip the loop/bookkeeping bytecode entirely. Stage
+        # caching and streaming retention need the interpreted loop, so those
+        # pipelines opt out.
+        if self._compiled is None:
+            self._compile_stages()
+        if self._retain is not None or any(stage.has_cache() for stage in self.stages):
+            self._specialized = False
+            return
+        if not self._compiled:
+            self._specialized = False
+            return
+        lines = ["def _run_stages(parents, data_records):"]
+        namespace = {}
+        for index, (stage, resolve) in enumerate(self._compiled):
+            namespace[f"run_{index}"] = stage.run
+            inline_keys = getattr(resolve, "_inline_keys", None)
+            if inline_keys is not None:
+                # Known-present, check-free inputs become a literal dict
+                # display — key strings land in the bytecode as constants.
+                gather = "{" + ", ".join(f"{key!r}: data_records[{key!r}]" for key in inline_keys) + "}"
+                lines.append(f"    result = run_{index}({gather}, parents, True)")
+            else:
+                namespace[f"resolve_{index}"] = resolve
+                lines.append(f"    result = run_{index}(resolve_{index}(parents), parents, True)")
+            lines.append("    data_records.update(result)")
+        lines.append("    return result")
+        exec(compile("\n".join(lines), "<pipeline>", "exec"), namespace)
+        self._specialized = namespace["_run_stages"]
+
+    def _run(self, inputs: PipelineDataMap, parents=None, _validated=False) -> PipelineDataMap:
         if parents == None:
             parents = []
-        self._validate_inputs(inputs)
+        if not _validated:
+            self._validate_inputs(inputs)
+        self._resolution_cache.clear()
         self.data_records.update(inputs)
+        if parents:
+            self._scope = parents[-1]._scope.new_child(self.data_records)
+        else:
+            self._scope = ChainMap(self.data_records)
         result = {}
         parents.append(self)
-        for stage in self.stages:
-            required_inputs = {}
-            for key, expected_type in stage.get_inputs().items():
-                input_def = PipelineDataDefinition(type=expected_type, name=key)
-                try:
-                    value = self.resolve_input(parents.copy(), input_def)
-                    required_inputs[key] = value
-                except LookupError:
-                    raise KeyError(f"Missing required input '{key}' for stage {stage}")
-            result = stage.run(required_inputs, parents)
-            self.data_records.update(result)
+        if self._compiled is None:
+            self._compile_stages()
+            self._specialized = None
+        if self._specialized is None:
+            self._specialize()
+        if self._specialized:
+            return self._specialized(parents, self.data_records)
+        free_after = None
+        if self._retain is not None:
+            if self._dag_levels is None:
+                self._compile_dag()
+            free_after = self._free_after
+        # Local-bind the loop's hot attributes once: every reference below
+        # becomes a LOAD_FAST instead of a LOAD_ATTR per iteration.
+        data_records = self.data_records
+        update = data_records.update
+        stage_cache = self._stage_cache
+        stage_cache_max = self._stage_cache_max
+        disjoint = self._disjoint_outputs
+        for index, (stage, resolve) in enumerate(self._compiled):
+            required_inputs = resolve(parents)
+            if stage.has_cache():
+                key = (id(stage), tuple(sorted((k, _hash_value(v)) for k, v in required_inputs.items())))
+                if key in stage_cache:
+                    stage_cache.move_to_end(key)
+                    result = stage_cache[key]
+                else:
+                    result = stage.run(required_inputs, parents, _validated=True)
+                    stage_cache[key] = result
+                    if len(stage_cache) > stage_cache_max:
+                        stage_cache.popitem(last=False)
+                update(result)
+            elif disjoint:
+                stage_result = stage.run_into(required_inputs, data_records, parents, _validated=True)
+                if stage_result is not None:
+                    result = stage_result
+            else:
+                result = stage.run(required_inputs, parents, _validated=True)
+                update(result)
+            if free_after is not None:
+                for key in free_after[index]:
+                    if key in data_records:
+                        del data_records[key]
         return result
 
+    # Value types whose equality is stable, so a matching signature really
+    # means the previous run would be recomputed verbatim.
+    _MEMO_VALUE_TYPES = (int, float, complex, bool, str, bytes, frozenset, type(None))
+
+    def _memo_signature(self, inputs):
+        sig = []
+        for key in sorted(inputs):
+            value = inputs[key]
+            if type(value) not in self._MEMO_VALUE_TYPES:
+                return None
+            sig.append((key, value))
+        return tuple(sig)
+
+    def invalidate(self) -> Self:
+        self._last_input_sig = None
+        self._last_output = None
+        return self
+
     def run(self, inputs: PipelineDataMap, parents=None) -> PipelineDataMap:
+        inputs = _intern_keys(inputs)
+        sig = None
+        if self._memoize:
+            sig = self._memo_signature(inputs)
+            if sig is not None and sig == self._last_input_sig:
+                return self._last_output
         self._run(inputs, parents)
         all_data = self.data_records
-        return {k: v for k, v in all_data.items() if k in self.outputs.keys()}
+        result = {k: all_data[k] for k in self._outputs_keyset if k in all_data}
+        if sig is not None:
+            self._last_input_sig = sig
+            self._last_output = result
+        return result
+
+    def _compile_dag(self):
+        # Group stages into levels: a stage lands one level below the deepest
+        # stage producing one of its declared inputs, so stages within the
+        # same level have no declared data dependency on each other.
+        produced_by = {}
+        level_of = []
+        for index, stage in enumerate(self.stages):
+            level = 0
+            for key in stage.get_inputs():
+                producer = produced_by.get(key)
+                if producer is not None:
+                    level = max(level, level_of[producer] + 1)
+            level_of.append(level)
+            for key in stage.get_outputs():
+                produced_by[key] = index
+        levels: List[List[int]] = [[] for _ in range(max(level_of, default=-1) + 1)]
+        for index, level in enumerate(level_of):
+            levels[level].append(index)
+        self._dag_levels = levels
+        # Track the last stage that can consume each key. Transformer chains
+        # count as consumers of their own inputs, since they may fire lazily
+        # while resolving a stage's inputs.
+        last_use = {}
+        for index, stage in enumerate(self.stages):
+            for key in self._effective_inputs(stage):
+                last_use[key] = index
+        free_after: List[List[str]] = [[] for _ in self.stages]
+        if self._retain is not None:
+            keep = self._outputs_keyset | self._retain
+            for key, index in last_use.items():
+                if key not in keep:
+                    free_after[index].append(key)
+        self._free_after = free_after
+
+    def _effective_inputs(self, stage):
+        needed = list(stage.get_inputs())
+        seen = set(needed)
+        for name in needed:
+            for transformer in self.transforms:
+                if name in transformer.get_output_keys():
+                    for key in transformer.get_inputs():
+                        if key not in seen:
+                            seen.add(key)
+                            needed.append(key)
+        return seen
+
+    async def _run_stage_async(self, loop, stage, required_inputs, parents):
+        if getattr(stage, "_is_async", False):
+            return await stage.run_async(required_inputs, parents, True)
+        return await loop.run_in_executor(None, stage.run, required_inputs, parents, True)
+
+    async def run_async(self, inputs: PipelineDataMap, parents=None) -> PipelineDataMap:
+        if parents == None:
+            parents = []
+        self._validate_inputs(inputs)
+        self._resolution_cache.clear()
+        self.data_records.update(inputs)
+        if parents:
+            self._scope = parents[-1]._scope.new_child(self.data_records)
+        else:
+            self._scope = ChainMap(self.data_records)
+        parents.append(self)
+        if self._compiled is None:
+            self._compile_stages()
+        if self._dag_levels is None:
+            self._compile_dag()
+        loop = asyncio.get_running_loop()
+        for level in self._dag_levels:
+            tasks = []
+            for index in level:
+                stage, resolve = self._compiled[index]
+                required_inputs = resolve(parents)
+                tasks.append(self._run_stage_async(loop, stage, required_inputs, parents))
+            for result in await asyncio.gather(*tasks):
+                if result:
+                    self.data_records.update(result)
+            if self._retain is not None:
+                for index in level:
+                    for key in self._free_after[index]:
+                        if key in self.data_records:
+                            del self.data_records[key]
+        all_data = self.data_records
+        return {k: all_data[k] for k in self._outputs_keyset if k in all_data}
+
+    def run_sync(self, inputs: PipelineDataMap, parents=None) -> PipelineDataMap:
+        return asyncio.run(self.run_async(inputs, parents))
     
+    def _invalidate_plan(self):
+        # One choke point for every derived structure that depends on the
+        # pipeline's topology or schemas: the producer plan, the compiled
+        # resolvers (whose known-present analysis reads dependencies), the
+        # specialized run, the DAG levels and the whole-run memo.
+        self._plan = None
+        self._compiled = None
+        self._specialized = None
+        self._dag_levels = None
+        self._last_input_sig = None
+        self._last_output = None
+
     def _append_stage(self, stage: PipelineStage):
         self.stages.append(stage)
+        self._invalidate_plan()
+        if stage.has_cache():
+            self._cached_stages.append(stage)
+        if isinstance(stage, MatchCaseBranch):
+            if self._profile_reorder:
+                stage.profile_reorder = True
+            # A match nested inside a case branch must bubble schema
+            # invalidations up to the enclosing match.
+            stage._match_parent = getattr(self, "_match_parent", None)
         if len(self.stages) == 1 and not self._deps_set:
             self.dependencies = stage.get_inputs()
         if not self._out_set:
@@ -428,14 +1195,19 @@ class Pipeline:
     
     def transformer(self, transformer: Union[callable, PipelineTransformer]) -> Self:
         if callable(transformer):
-            self.transforms.append(PipelineTransformer(transformer))
-        else:
-            self.transforms.append(transformer)
+            transformer = PipelineTransformer(transformer)
+        self.transforms.append(transformer)
+        self._invalidate_plan()
+        for name in transformer.get_outputs():
+            self._producer_index.setdefault(name, transformer)
+        if transformer.has_cache():
+            self._cached_transformers.append(transformer)
         return self
     
     def dependency(self, dependencies: PipelineInputMap ) -> Self:
         self._deps_set = True
         self.dependencies = dependencies
+        self._invalidate_plan()
         return self
 
     def output(self, outputs: PipelineOutputMap) -> Self:
@@ -443,20 +1215,49 @@ class Pipeline:
         self.outputs = outputs
         return self
 
+    def match(self, key_name: str, fn: Callable[["MatchHelper"], None]) -> Self:
+        helper = MatchHelper(self, key_name)
+        fn(helper)
+        return helper.end()
+
 class PipelineBranch(PipelineStage, Pipeline):
 
+    # Pipeline is unslotted, so branches still carry a __dict__ for their
+    # pipeline state; the empty slots just avoid adding a second one.
+    __slots__ = ()
+
     def __init__(self):
         PipelineStage.__init__(self)
+        # Set when this branch belongs to a MatchCaseBranch, so mutations
+        # here can drop the match's cached merged schema. Assigned before
+        # Pipeline.__init__ because the outputs setter there runs this
+        # class's _invalidate_plan, which reads it.
+        self._match_parent: Union["MatchCaseBranch", None] = None
         Pipeline.__init__(self)
 
+    def _invalidate_plan(self):
+        Pipeline._invalidate_plan(self)
+        if self._match_parent is not None:
+            self._match_parent._invalidate_schema()
+
     def get_inputs(self):
         return Pipeline.get_dependencies(self)
-    
+
+    def get_inputs_items(self):
+        # Branch schemas change as cases are added, so compute on demand.
+        return tuple(self.get_inputs().items())
+
     def get_outputs(self):
         return Pipeline.get_outputs(self)
 
-    def run(self, inputs: PipelineDataMap, parents=None) -> PipelineDataMap:
-        Pipeline._run(self, inputs, parents)
+    def get_output_keys(self):
+        # Branch outputs change as cases are added, so compute on demand.
+        return frozenset(self.get_outputs())
+
+    def run(self, inputs: PipelineDataMap, parents=None, _validated=False) -> PipelineDataMap:
+        # A parent that already validated this branch's (merged) schema
+        # vouches for the inputs; skip the redundant isinstance pass.
+        Pipeline._run(self, inputs, parents, _validated)
         return self.data_records
         
 class MatchCaseBranch(PipelineBranch):
@@ -466,22 +1267,62 @@ class MatchCaseBranch(PipelineBranch):
         self.cases: List[Tuple[Any, PipelineBranch]] = []
         self.default_branch: PipelineBranch | None = None
         self.finally_branch: PipelineBranch | None = None
+        # Hashable case values dispatch through one dict lookup; unhashable
+        # ones go to the linear-scan fallback. Both are maintained
+        # incrementally as cases are registered.
+        self._dispatch: Dict[Any, PipelineBranch] = {}
+        self._dispatch_fallback: List[Tuple[Any, PipelineBranch]] = []
+        self.profile_reorder = False
+        self._frozen = False
+        self._hits: Dict[int, int] = {}
+        self._run_count = 0
+        self._inputs_cache: Union[PipelineInputMap, None] = None
+        self._outputs_cache: Union[PipelineOutputMap, None] = None
+        self._conflicts_cache: Union[frozenset, None] = None
+
+    def _invalidate_schema(self):
+        self._inputs_cache = None
+        self._outputs_cache = None
+        self._conflicts_cache = None
+        if self._match_parent is not None:
+            self._match_parent._invalidate_schema()
 
     def case(self, value):
         branch = PipelineBranch()
+        branch._match_parent = self
         self.cases.append((value, branch))
+        try:
+            if value not in self._dispatch:
+                self._dispatch[value] = branch
+        except TypeError:
+            self._dispatch_fallback.append((value, branch))
+        self._invalidate_schema()
         return branch
 
     def default(self):
         self.default_branch = PipelineBranch()
+        self.default_branch._match_parent = self
+        self._invalidate_schema()
         return self.default_branch
 
     def finally_(self):
         self.finally_branch = PipelineBranch()
+        self.finally_branch._match_parent = self
+        self._invalidate_schema()
         return self.finally_branch
 
+    def freeze(self):
+        # Stop profile-guided reordering once callers consider it tuned.
+        self._frozen = True
+        return self
+
     def get_inputs(self):
-        # Inputs needed include the match key plus inputs required by any case/default/finally
+        # Inputs needed include the match key plus inputs required by any
+        # case/default/finally. The merge is cached; branch mutations drop
+        # it via _invalidate_schema.
+        inputs = self._inputs_cache
+        if inputs is not None:
+            return inputs
         inputs = {self.key_name: Any}
         for _, branch in self.cases:
             inputs.update(branch.get_inputs())
@@ -489,10 +1330,36 @@ class MatchCaseBranch(PipelineBranch):
             inputs.update(self.default_branch.get_inputs())
         if self.finally_branch:
             inputs.update(self.finally_branch.get_inputs())
+        self._inputs_cache = inputs
         return inputs
 
+    def conflicted_inputs(self):
+        # Keys declared with different types by different branches. The
+        # merged get_inputs() view keeps only the last writer for these, so
+        # callers must not type-check against it; the taken branch validates
+        # its real schema instead. Cached like get_inputs.
+        conflicts = self._conflicts_cache
+        if conflicts is not None:
+            return conflicts
+        branches = [branch for _, branch in self.cases]
+        if self.default_branch:
+            branches.append(self.default_branch)
+        if self.finally_branch:
+            branches.append(self.finally_branch)
+        declared: Dict[str, Any] = {}
+        conflicts = set()
+        for branch in branches:
+            for key, expected_type in branch.get_inputs().items():
+                if declared.setdefault(key, expected_type) != expected_type:
+                    conflicts.add(key)
+        self._conflicts_cache = frozenset(conflicts)
+        return self._conflicts_cache
+
     def get_outputs(self):
-        # Outputs are union of all branches outputs
+        # Outputs are union of all branches outputs, cached like get_inputs.
+        outputs = self._outputs_cache
+        if outputs is not None:
+            return outputs
         outputs = {}
         for _, branch in self.cases:
             outputs.update(branch.get_outputs())
@@ -500,29 +1367,56 @@ class MatchCaseBranch(PipelineBranch):
             outputs.update(self.default_branch.get_outputs())
         if self.finally_branch:
             outputs.update(self.finally_branch.get_outputs())
+        self._outputs_cache = outputs
         return outputs
 
-    def run(self, inputs: PipelineDataMap, parents=None) -> PipelineDataMap:
+    def run(self, inputs: PipelineDataMap, parents=None, _validated=False) -> PipelineDataMap:
         match_value = inputs.get(self.key_name)
         result = {}
+        # A validated merged schema only covers a branch when no two
+        # branches disagree on a key's type: with conflicts the merge kept
+        # an arbitrary winner (and the parent skipped checking those keys),
+        # so the taken branch must re-validate its own schema.
+        trusted = _validated and not self.conflicted_inputs()
 
         # Run matched case
         matched = False
-        for value, branch in self.cases:
-            if value == match_value:
-                case_result = branch.run(inputs, parents)
-                result.update(case_result)
-                matched = True
-                break
-        
+        try:
+            branch = self._dispatch.get(match_value)
+        except TypeError:
+            # Unhashable match value: fall back to the full linear scan.
+            branch = None
+            for value, candidate in self.cases:
+                if value == match_value:
+                    branch = candidate
+                    break
+        else:
+            if branch is None:
+                for value, candidate in self._dispatch_fallback:
+                    if value == match_value:
+                        branch = candidate
+                        break
+        if branch is not None:
+            if self.profile_reorder and not self._frozen:
+                self._hits[id(branch)] = self._hits.get(id(branch), 0) + 1
+                self._run_count += 1
+                if self._run_count % 256 == 0 and self._dispatch_fallback:
+                    # Move the statistically hottest fallback cases to the
+                    # front so the average linear scan shortens over time.
+                    hits = self._hits
+                    self._dispatch_fallback.sort(key=lambda entry: -hits.get(id(entry[1]), 0))
+            case_result = branch.run(inputs, parents, trusted)
+            result.update(case_result)
+            matched = True
+
         # Run default if no case matched
         if not matched and self.default_branch:
-            default_result = self.default_branch.run(inputs, parents)
+            default_result = self.default_branch.run(inputs, parents, trusted)
             result.update(default_result)
 
         # Always run finally
         if self.finally_branch:
-            finally_result = self.finally_branch.run(inputs, parents)
+            finally_result = self.finally_branch.run(inputs, parents, trusted)
             result.update(finally_result)
 
         return result
@@ -547,11 +1441,3 @@ class MatchHelper:
         return self.pipeline
 
 
-def match(self, key_name: str, fn: Callable[[MatchHelper], None]):
-    helper = MatchHelper(self, key_name)
-    fn(helper)
-    return helper.end()
-
-
-# Add match method to Pipeline dynamically
-setattr(Pipeline, "match", match)